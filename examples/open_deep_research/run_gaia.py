@@ -1,4 +1,5 @@
 import argparse
+import collections
 import json
 import os
 import threading
@@ -7,15 +8,14 @@ from datetime import datetime
 from pathlib import Path
 from typing import List
 
-import datasets
-import pandas as pd
+import requests
 from dotenv import load_dotenv
 from huggingface_hub import login
+from requests.adapters import HTTPAdapter
+from scripts.cached_model import CachedModel, CompletionCache
+from scripts.rate_limited_model import RateLimitedModel, RequestRateLimiter
 from scripts.reformulator import prepare_response
-from scripts.run_agents import (
-    get_single_file_description,
-    get_zip_description,
-)
+from scripts.run_agents import encode_intermediate_steps, get_attached_files_prompt
 from scripts.text_inspector_tool import TextInspectorTool
 from scripts.text_web_browser import (
     ArchiveSearchTool,
@@ -29,6 +29,7 @@ from scripts.text_web_browser import (
 )
 from scripts.visual_qa import visualizer
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
 from smolagents import (
     CodeAgent,
@@ -66,16 +67,50 @@ AUTHORIZED_IMPORTS = [
     "csv",
 ]
 load_dotenv(override=True)
-login(os.getenv("HF_TOKEN"))
 
 append_answer_lock = threading.Lock()
 
 
 def parse_args():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("GAIA_CONCURRENCY", 8)))
     parser.add_argument("--model-id", type=str, default="o1")
     parser.add_argument("--run-name", type=str, required=True)
+    parser.add_argument(
+        "--model-cache-path",
+        type=str,
+        default=None,
+        help="SQLite file used to cache model completions across reruns (disabled if not set)",
+    )
+    parser.add_argument(
+        "--stream-outputs",
+        action="store_true",
+        help="Stream completions to stop them as soon as a stop sequence is generated (requires a backend that "
+        "supports stream_options)",
+    )
+    parser.add_argument(
+        "--skip-image-captions",
+        action="store_true",
+        help="Do not caption a single attached image up front, and let the agent inspect it with the visualizer",
+    )
+    parser.add_argument(
+        "--max-requests-per-minute",
+        type=float,
+        default=None,
+        help="Maximum number of model requests started per minute across all workers (unlimited if not set)",
+    )
+    parser.add_argument(
+        "--prompt-cache-key",
+        type=str,
+        default=None,
+        help="Key sent with OpenAI requests so that runs sharing the same agent system prompts hit the same prompt "
+        "cache (e.g. 'gaia-code-agent-v1')",
+    )
+    parser.add_argument(
+        "--compress-intermediate-steps",
+        action="store_true",
+        help="Store intermediate steps gzip-compressed in the answers file (read them with decode_intermediate_steps)",
+    )
     return parser.parse_args()
 
 
@@ -89,22 +124,26 @@ SET = "validation"
 
 custom_role_conversions = {"tool-call": "assistant", "tool-response": "user"}
 
-### LOAD EVALUATION DATASET
-
-eval_ds = datasets.load_dataset("gaia-benchmark/GAIA", "2023_all")[SET]
-eval_ds = eval_ds.rename_columns({"Question": "question", "Final answer": "true_answer", "Level": "task"})
+GAIA_FILES_PREFIX = f"data/gaia/{SET}/"
 
 
 def preprocess_file_paths(row):
-    if len(row["file_name"]) > 0:
-        row["file_name"] = f"data/gaia/{SET}/" + row["file_name"]
+    if row["file_name"]:
+        row["file_name"] = GAIA_FILES_PREFIX + row["file_name"]
     return row
 
 
-eval_ds = eval_ds.map(preprocess_file_paths)
-eval_df = pd.DataFrame(eval_ds)
-print("Loaded evaluation dataset:")
-print(eval_df["task"].value_counts())
+def load_gaia_dataset():
+    # datasets is slow to import: only pay for it when the evaluation actually runs
+    import datasets
+
+    eval_ds = datasets.load_dataset("gaia-benchmark/GAIA", "2023_all")[SET]
+    eval_ds = eval_ds.rename_columns({"Question": "question", "Final answer": "true_answer", "Level": "task"})
+    eval_ds = eval_ds.map(preprocess_file_paths)
+    print("Loaded evaluation dataset:")
+    print(collections.Counter(eval_ds["task"]))
+    return eval_ds
+
 
 user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36 Edg/119.0.0.0"
 
@@ -120,12 +159,18 @@ BROWSER_CONFIG = {
 
 os.makedirs(f"./{BROWSER_CONFIG['downloads_folder']}", exist_ok=True)
 
+# One pooled session is shared by the browsers of all workers, so that connections to a host are reused
+SHARED_SESSION = requests.Session()
+http_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=Retry(total=3, backoff_factor=0.3))
+SHARED_SESSION.mount("https://", http_adapter)
+SHARED_SESSION.mount("http://", http_adapter)
+
 
 def create_agent_hierarchy(model: Model):
     text_limit = 100000
     ti_tool = TextInspectorTool(model, text_limit)
 
-    browser = SimpleTextBrowser(**BROWSER_CONFIG)
+    browser = SimpleTextBrowser(**BROWSER_CONFIG, session=SHARED_SESSION)
 
     WEB_TOOLS = [
         SearchInformationTool(browser),
@@ -173,17 +218,41 @@ def append_answer(entry: dict, jsonl_file: str) -> None:
     jsonl_file.parent.mkdir(parents=True, exist_ok=True)
     with append_answer_lock, open(jsonl_file, "a", encoding="utf-8") as fp:
         fp.write(json.dumps(entry) + "\n")
+        # Make the record durable so an interrupted run can resume from it
+        fp.flush()
+        os.fsync(fp.fileno())
     assert os.path.exists(jsonl_file), "File not found!"
     print("Answer exported to file:", jsonl_file.resolve())
 
 
-def answer_single_question(example, model_id, answers_file, visual_inspection_tool):
+def answer_single_question(
+    example,
+    model_id,
+    answers_file,
+    visual_inspection_tool,
+    completion_cache=None,
+    stream_outputs=False,
+    caption_images=True,
+    rate_limiter=None,
+    prompt_cache_key=None,
+    compress_intermediate_steps=False,
+):
+    # The agents' system prompts are the same for every question: a shared cache key routes all the runs to the
+    # same provider cache, so that this common prefix is billed and processed as cached input tokens
+    model_kwargs = {"extra_body": {"prompt_cache_key": prompt_cache_key}} if prompt_cache_key is not None else {}
     model = LiteLLMModel(
         model_id,
         custom_role_conversions=custom_role_conversions,
         max_completion_tokens=8192,
         reasoning_effort="high",
+        stream_outputs=stream_outputs,
+        **model_kwargs,
     )
+    if rate_limiter is not None:
+        model = RateLimitedModel(model, rate_limiter)
+    if completion_cache is not None:
+        # Wrapping the rate-limited model means that cache hits do not wait for the limiter
+        model = CachedModel(model, completion_cache)
     # model = HfApiModel("Qwen/Qwen2.5-72B-Instruct", provider="together")
     #     "https://lnxyuvj02bpe6mam.us-east-1.aws.endpoints.huggingface.cloud",
     #     custom_role_conversions=custom_role_conversions,
@@ -201,17 +270,13 @@ Here is the task:
 """ + example["question"]
 
     if example["file_name"]:
-        if ".zip" in example["file_name"]:
-            prompt_use_files = "\n\nTo solve the task above, you will have to use these attached files:\n"
-            prompt_use_files += get_zip_description(
-                example["file_name"], example["question"], visual_inspection_tool, document_inspection_tool
-            )
-        else:
-            prompt_use_files = "\n\nTo solve the task above, you will have to use this attached file:"
-            prompt_use_files += get_single_file_description(
-                example["file_name"], example["question"], visual_inspection_tool, document_inspection_tool
-            )
-        augmented_question += prompt_use_files
+        augmented_question += get_attached_files_prompt(
+            example["file_name"],
+            example["question"],
+            visual_inspection_tool,
+            document_inspection_tool,
+            caption_images=caption_images,
+        )
 
     start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
@@ -248,7 +313,9 @@ Here is the task:
         "question": example["question"],
         "augmented_question": augmented_question,
         "prediction": output,
-        "intermediate_steps": intermediate_steps,
+        "intermediate_steps": encode_intermediate_steps(intermediate_steps)
+        if compress_intermediate_steps
+        else intermediate_steps,
         "parsing_error": parsing_error,
         "iteration_limit_exceeded": iteration_limit_exceeded,
         "agent_error": str(exception) if raised_exception else None,
@@ -263,30 +330,65 @@ Here is the task:
 
 def get_examples_to_answer(answers_file, eval_ds) -> List[dict]:
     print(f"Loading answers from {answers_file}...")
-    try:
-        done_questions = pd.read_json(answers_file, lines=True)["question"].tolist()
+    done_questions = set()
+    if os.path.exists(answers_file):
+        # Only the question of each record is needed, so records are parsed one line at a time
+        with open(answers_file, encoding="utf-8") as fp:
+            for line in fp:
+                try:
+                    done_questions.add(json.loads(line)["question"])
+                except (json.JSONDecodeError, KeyError) as e:
+                    print("Skipping unusable record: ", e)
+    if done_questions:
         print(f"Found {len(done_questions)} previous results!")
-    except Exception as e:
-        print("Error when loading records: ", e)
+    else:
         print("No usable records! ▶️ Starting new.")
-        done_questions = []
     return [line for line in eval_ds.to_list() if line["question"] not in done_questions]
 
 
 def main():
     args = parse_args()
     print(f"Starting run with arguments: {args}")
+    login(os.getenv("HF_TOKEN"))
+    eval_ds = load_gaia_dataset()
 
     answers_file = f"output/{SET}/{args.run_name}.jsonl"
     tasks_to_run = get_examples_to_answer(answers_file, eval_ds)
+    # A single cache is shared by all workers, so that writes to the SQLite file are serialized
+    completion_cache = CompletionCache(args.model_cache_path) if args.model_cache_path is not None else None
+    # The limit applies to the whole run, so that the provider's rate limit holds whatever the concurrency
+    rate_limiter = (
+        RequestRateLimiter(args.max_requests_per_minute) if args.max_requests_per_minute is not None else None
+    )
 
     with ThreadPoolExecutor(max_workers=args.concurrency) as exe:
-        futures = [
-            exe.submit(answer_single_question, example, args.model_id, answers_file, visualizer)
+        futures = {
+            exe.submit(
+                answer_single_question,
+                example,
+                model_id=args.model_id,
+                answers_file=answers_file,
+                visual_inspection_tool=visualizer,
+                completion_cache=completion_cache,
+                stream_outputs=args.stream_outputs,
+                caption_images=not args.skip_image_captions,
+                rate_limiter=rate_limiter,
+                prompt_cache_key=args.prompt_cache_key,
+                compress_intermediate_steps=args.compress_intermediate_steps,
+            ): example
             for example in tasks_to_run
-        ]
+        }
         for f in tqdm(as_completed(futures), total=len(tasks_to_run), desc="Processing tasks"):
-            f.result()
+            try:
+                f.result()
+            except Exception as e:
+                # One failing example should not bring down the whole pool: it is not written to the answers file,
+                # so it will be picked up again when resuming the run
+                example = futures[f]
+                print(f"Error when processing task {example['task_id']} ({example['question'][:100]!r}): ", e)
+
+    if completion_cache is not None:
+        completion_cache.close()
 
     # for example in tasks_to_run:
     #     answer_single_question(example, args.model_id, answers_file, visualizer)
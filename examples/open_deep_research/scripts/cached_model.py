@@ -0,0 +1,118 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from smolagents.models import ChatMessage, Model, get_dict_from_nested_dataclasses, get_tool_json_schema
+from smolagents.tools import Tool
+
+
+class CompletionCache:
+    """Stores model completions in a local SQLite file.
+
+    A single instance is meant to be shared by all the models of a run: it holds one connection and serializes
+    accesses to it, so that concurrent workers never contend for the database. Cache failures are reported but never
+    raised, since the cache must not make a task fail.
+
+    Parameters:
+        cache_path (`str`, *optional*, defaults to `".model_cache.sqlite"`):
+            Path of the SQLite file used to store completions.
+    """
+
+    def __init__(self, cache_path: str = ".model_cache.sqlite"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(cache_path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, message TEXT)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[ChatMessage]:
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT message FROM completions WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print("Error when reading the model cache: ", e)
+            return None
+        return ChatMessage.from_dict(json.loads(row[0])) if row is not None else None
+
+    def set(self, key: str, message: ChatMessage) -> None:
+        serialized_message = json.dumps(get_dict_from_nested_dataclasses(message, ignore_key="raw"), default=str)
+        try:
+            with self._lock:
+                self._db.execute("INSERT OR REPLACE INTO completions VALUES (?, ?)", (key, serialized_message))
+                self._db.commit()
+        except sqlite3.Error as e:
+            print("Error when writing to the model cache: ", e)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class CachedModel(Model):
+    """Wraps a model and answers calls from a [`CompletionCache`], so that reruns issuing identical calls (same model
+    configuration, messages, stop sequences, tools and kwargs) do not hit the provider.
+
+    Sampled calls (`temperature > 0`) are never cached, since they are not meant to be reproducible.
+
+    Parameters:
+        model (`Model`):
+            The model to wrap.
+        cache (`CompletionCache`):
+            The cache storing completions, usually shared by all the models of a run.
+    """
+
+    def __init__(self, model: Model, cache: CompletionCache):
+        super().__init__()
+        self.model = model
+        self.model_id = model.model_id
+        self.cache = cache
+
+    def _get_key(self, messages, stop_sequences, grammar, tools_to_call_from, kwargs) -> str:
+        # Look through wrappers such as `RateLimitedModel`, which do not change the completions
+        wrapped_model = self.model
+        while hasattr(wrapped_model, "model") and not isinstance(wrapped_model, Model):
+            wrapped_model = wrapped_model.model
+        model_configuration = {
+            "class": type(wrapped_model).__name__,
+            "model_id": self.model_id,
+            "api_base": getattr(self.model, "api_base", None),
+            "stream_outputs": getattr(self.model, "stream_outputs", False),
+            "custom_role_conversions": getattr(self.model, "custom_role_conversions", None),
+            "kwargs": self.model.kwargs,
+        }
+        payload = [
+            model_configuration,
+            messages,
+            stop_sequences,
+            grammar,
+            [get_tool_json_schema(tool) for tool in tools_to_call_from] if tools_to_call_from else None,
+            kwargs,
+        ]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def __call__(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        tools_to_call_from: Optional[List[Tool]] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        temperature = kwargs.get("temperature", self.model.kwargs.get("temperature"))
+        key = None
+        if not temperature:
+            key = self._get_key(messages, stop_sequences, grammar, tools_to_call_from, kwargs)
+            message = self.cache.get(key)
+            if message is not None:
+                self.last_input_token_count = 0
+                self.last_output_token_count = 0
+                return message
+
+        message = self.model(messages, stop_sequences, grammar, tools_to_call_from, **kwargs)
+        self.last_input_token_count = self.model.last_input_token_count
+        self.last_output_token_count = self.model.last_output_token_count
+        if key is not None:
+            self.cache.set(key, message)
+        return message
@@ -0,0 +1,55 @@
+import threading
+import time
+from typing import Any
+
+from smolagents.models import ChatMessage, Model
+
+
+class RequestRateLimiter:
+    """Spaces out requests so that at most `requests_per_minute` of them start in any minute.
+
+    A single instance is meant to be shared by all the models of a run, so that the limit holds across concurrent
+    workers.
+
+    Parameters:
+        requests_per_minute (`float`):
+            Maximum number of requests started per minute.
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60 / requests_per_minute
+        self._lock = threading.Lock()
+        self._next_request_time = 0.0
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_request_time - now
+            self._next_request_time = max(now, self._next_request_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class RateLimitedModel:
+    """Wraps a model so that each of its calls first waits for a [`RequestRateLimiter`].
+
+    Every other attribute (`model_id`, token counts, `kwargs`...) is read from the wrapped model, so the wrapper can
+    be used anywhere the model is.
+
+    Parameters:
+        model (`Model`):
+            The model to wrap.
+        rate_limiter (`RequestRateLimiter`):
+            The limiter shared by all the models of a run.
+    """
+
+    def __init__(self, model: Model, rate_limiter: RequestRateLimiter):
+        self.model = model
+        self.rate_limiter = rate_limiter
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+    def __call__(self, *args, **kwargs) -> ChatMessage:
+        self.rate_limiter.acquire()
+        return self.model(*args, **kwargs)
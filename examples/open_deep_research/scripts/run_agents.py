@@ -1,13 +1,29 @@
+import base64
+import gzip
+import hashlib
 import json
 import os
 import shutil
 import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # import tqdm.asyncio
 from smolagents.utils import AgentError
 
 
+CAPTION_CACHE_DIR = ".caption_cache"
+EXTRACTED_MARKER = ".extracted"
+ZIP_DESCRIPTION_MAX_WORKERS = 8
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+DOCUMENT_EXTENSIONS = (".pdf", ".xls", ".xlsx", ".docx", ".doc", ".xml")
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".wav")
+
+unpack_archive_lock = threading.Lock()
+
+
 def serialize_agent_error(obj):
     if isinstance(obj, AgentError):
         return {"error_type": obj.__class__.__name__, "message": obj.message}
@@ -15,57 +31,144 @@ def serialize_agent_error(obj):
         return str(obj)
 
 
+def encode_intermediate_steps(intermediate_steps: list) -> str:
+    """Compresses the intermediate steps of a run into a base64 string, several times smaller than their JSON."""
+    return base64.b64encode(gzip.compress(json.dumps(intermediate_steps, default=str).encode())).decode()
+
+
+def decode_intermediate_steps(intermediate_steps):
+    """Reverses `encode_intermediate_steps`, and returns steps that were stored uncompressed as they are."""
+    if isinstance(intermediate_steps, str):
+        return json.loads(gzip.decompress(base64.b64decode(intermediate_steps)))
+    return intermediate_steps
+
+
+def get_cached_description(file_path: str, prompt: str, describe) -> str:
+    """Returns `describe()`, cached on disk by the file contents and the prompt, so reruns and files shared
+    across questions do not trigger new model calls."""
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(chunk)
+    key = file_hash.hexdigest() + hashlib.sha256(prompt.encode()).hexdigest()
+    cache_path = os.path.join(CAPTION_CACHE_DIR, f"{key}.txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            return f.read()
+
+    description = describe()
+    os.makedirs(CAPTION_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(description)
+    os.replace(tmp_path, cache_path)  # Atomic, so concurrent readers never see a partial caption
+    return description
+
+
 def get_image_description(file_name: str, question: str, visual_inspection_tool) -> str:
     prompt = f"""Write a caption of 5 sentences for this image. Pay special attention to any details that might be useful for someone answering the following question:
 {question}. But do not try to answer the question directly!
 Do not add any information that is not present in the image."""
-    return visual_inspection_tool(image_path=file_name, question=prompt)
+    return get_cached_description(
+        file_name, prompt, lambda: visual_inspection_tool(image_path=file_name, question=prompt)
+    )
 
 
 def get_document_description(file_path: str, question: str, document_inspection_tool) -> str:
     prompt = f"""Write a caption of 5 sentences for this document. Pay special attention to any details that might be useful for someone answering the following question:
 {question}. But do not try to answer the question directly!
 Do not add any information that is not present in the document."""
-    return document_inspection_tool.forward_initial_exam_mode(file_path=file_path, question=prompt)
+    return get_cached_description(
+        file_path,
+        prompt,
+        lambda: document_inspection_tool.forward_initial_exam_mode(file_path=file_path, question=prompt),
+    )
 
 
-def get_single_file_description(file_path: str, question: str, visual_inspection_tool, document_inspection_tool):
-    file_extension = file_path.split(".")[-1]
-    if file_extension in ["png", "jpg", "jpeg"]:
-        file_description = f" - Attached image: {file_path}"
-        file_description += (
-            f"\n     -> Image description: {get_image_description(file_path, question, visual_inspection_tool)}"
-        )
-        return file_description
-    elif file_extension in ["pdf", "xls", "xlsx", "docx", "doc", "xml"]:
-        file_description = f" - Attached document: {file_path}"
-        image_path = file_path.split(".")[0] + ".png"
-        if os.path.exists(image_path):
-            description = get_image_description(image_path, question, visual_inspection_tool)
-        else:
-            description = get_document_description(file_path, question, document_inspection_tool)
-        file_description += f"\n     -> File description: {description}"
-        return file_description
-    elif file_extension in ["mp3", "m4a", "wav"]:
-        return f" - Attached audio: {file_path}"
+def get_image_file_description(
+    file_path: str, question: str, visual_inspection_tool, document_inspection_tool, caption_images: bool
+) -> str:
+    file_description = f" - Attached image: {file_path}"
+    if not caption_images:
+        # The agent inspects the image with the visualizer anyway: skip the extra captioning call
+        return file_description + f"\n     -> Inspect it with `{visual_inspection_tool.name}`."
+    return (
+        file_description
+        + f"\n     -> Image description: {get_image_description(file_path, question, visual_inspection_tool)}"
+    )
+
+
+def get_document_file_description(
+    file_path: str, question: str, visual_inspection_tool, document_inspection_tool, caption_images: bool
+) -> str:
+    image_path = os.path.splitext(file_path)[0] + ".png"
+    if os.path.exists(image_path):
+        description = get_image_description(image_path, question, visual_inspection_tool)
     else:
-        return f" - Attached file: {file_path}"
+        description = get_document_description(file_path, question, document_inspection_tool)
+    return f" - Attached document: {file_path}\n     -> File description: {description}"
+
+
+def get_audio_file_description(file_path: str, *args) -> str:
+    return f" - Attached audio: {file_path}"
+
+
+def get_other_file_description(file_path: str, *args) -> str:
+    return f" - Attached file: {file_path}"
+
+
+FILE_DESCRIPTION_GETTERS = {
+    **{extension: get_image_file_description for extension in IMAGE_EXTENSIONS},
+    **{extension: get_document_file_description for extension in DOCUMENT_EXTENSIONS},
+    **{extension: get_audio_file_description for extension in AUDIO_EXTENSIONS},
+}
+
+
+def get_single_file_description(
+    file_path: str, question: str, visual_inspection_tool, document_inspection_tool, caption_images: bool = True
+):
+    file_extension = os.path.splitext(file_path)[1].lower()
+    get_description = FILE_DESCRIPTION_GETTERS.get(file_extension, get_other_file_description)
+    return get_description(file_path, question, visual_inspection_tool, document_inspection_tool, caption_images)
 
 
 def get_zip_description(file_path: str, question: str, visual_inspection_tool, document_inspection_tool):
     folder_path = file_path.replace(".zip", "")
-    os.makedirs(folder_path, exist_ok=True)
-    shutil.unpack_archive(file_path, folder_path)
-
-    prompt_use_files = ""
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            prompt_use_files += "\n" + textwrap.indent(
-                get_single_file_description(file_path, question, visual_inspection_tool, document_inspection_tool),
-                prefix="    ",
-            )
-    return prompt_use_files
+    marker_path = os.path.join(folder_path, EXTRACTED_MARKER)
+    # GAIA reuses attachments across questions: only unpack an archive the first time it is seen
+    with unpack_archive_lock:
+        if not os.path.exists(marker_path):
+            os.makedirs(folder_path, exist_ok=True)
+            shutil.unpack_archive(file_path, folder_path)
+            open(marker_path, "w").close()
+
+    file_paths = [
+        os.path.join(root, file)
+        for root, _, files in os.walk(folder_path)
+        for file in files
+        if file != EXTRACTED_MARKER
+    ]
+    # Each caption is an independent model call, so the files of an archive are described concurrently
+    with ThreadPoolExecutor(max_workers=ZIP_DESCRIPTION_MAX_WORKERS) as executor:
+        descriptions = executor.map(
+            lambda file_path: get_single_file_description(
+                file_path, question, visual_inspection_tool, document_inspection_tool
+            ),
+            file_paths,
+        )
+        return "".join("\n" + textwrap.indent(description, prefix="    ") for description in descriptions)
+
+
+def get_attached_files_prompt(
+    file_path: str, question: str, visual_inspection_tool, document_inspection_tool, caption_images: bool = True
+) -> str:
+    if os.path.splitext(file_path)[1].lower() == ".zip":
+        return "\n\nTo solve the task above, you will have to use these attached files:\n" + get_zip_description(
+            file_path, question, visual_inspection_tool, document_inspection_tool
+        )
+    return "\n\nTo solve the task above, you will have to use this attached file:" + get_single_file_description(
+        file_path, question, visual_inspection_tool, document_inspection_tool, caption_images=caption_images
+    )
 
 
 def get_tasks_to_run(data, total: int, base_filename: Path, tasks_ids: list[int]):
@@ -29,6 +29,7 @@ class SimpleTextBrowser:
         downloads_folder: Optional[Union[str, None]] = None,
         serpapi_key: Optional[Union[str, None]] = None,
         request_kwargs: Optional[Union[Dict[str, Any], None]] = None,
+        session: Optional[requests.Session] = None,
     ):
         self.start_page: str = start_page if start_page else "about:blank"
         self.viewport_size = viewport_size  # Applies only to the standard uri types
@@ -41,7 +42,9 @@ class SimpleTextBrowser:
         self.serpapi_key = serpapi_key
         self.request_kwargs = request_kwargs
         self.request_kwargs["cookies"] = COOKIES
-        self._mdconvert = MarkdownConverter()
+        # Reusing a session keeps connections alive between requests, instead of a new handshake per page
+        self.session = session if session is not None else requests.Session()
+        self._mdconvert = MarkdownConverter(requests_session=self.session)
         self._page_content: str = ""
 
         self._find_on_page_query: Union[str, None] = None
@@ -274,7 +277,7 @@ class SimpleTextBrowser:
                 request_kwargs["stream"] = True
 
                 # Send a HTTP request to the URL
-                response = requests.get(url, **request_kwargs)
+                response = self.session.get(url, **request_kwargs)
                 response.raise_for_status()
 
                 # If the HTTP request was successful
@@ -423,7 +426,7 @@ DO NOT use this tool for .pdf or .txt or .htm files: for these types of files us
     def forward(self, url: str) -> str:
         if "arxiv" in url:
             url = url.replace("abs", "pdf")
-        response = requests.get(url)
+        response = self.browser.session.get(url)
         content_type = response.headers.get("content-type", "")
         extension = mimetypes.guess_extension(content_type)
         if extension and isinstance(extension, str):
@@ -459,8 +462,8 @@ class ArchiveSearchTool(Tool):
     def forward(self, url, date) -> str:
         no_timestamp_url = f"https://archive.org/wayback/available?url={url}"
         archive_url = no_timestamp_url + f"&timestamp={date}"
-        response = requests.get(archive_url).json()
-        response_notimestamp = requests.get(no_timestamp_url).json()
+        response = self.browser.session.get(archive_url).json()
+        response_notimestamp = self.browser.session.get(no_timestamp_url).json()
         if "archived_snapshots" in response and "closest" in response["archived_snapshots"]:
             closest = response["archived_snapshots"]["closest"]
             print("Archive found!", closest)
@@ -21,8 +21,11 @@ import os
 import re
 import tempfile
 import textwrap
+import threading
 import time
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from logging import getLogger
 from pathlib import Path
 from typing import Any, Callable, Dict, Generator, List, Optional, Set, Tuple, TypedDict, Union
@@ -74,8 +77,14 @@ def get_variable_names(self, template: str) -> Set[str]:
     return {match.group(1).strip() for match in pattern.finditer(template)}
 
 
+@lru_cache(maxsize=128)
+def compile_template(template: str) -> Template:
+    # Compiling a template costs far more than rendering it, and agents render the same few templates every step
+    return Template(template, undefined=StrictUndefined)
+
+
 def populate_template(template: str, variables: Dict[str, Any]) -> str:
-    compiled_template = Template(template, undefined=StrictUndefined)
+    compiled_template = compile_template(template)
     try:
         return compiled_template.render(**variables)
     except Exception as e:
@@ -841,6 +850,8 @@ You have been provided with these additional arguments, that you can access usin
             agent_dict["executor_kwargs"] = self.executor_kwargs
         if hasattr(self, "max_print_outputs_length"):
             agent_dict["max_print_outputs_length"] = self.max_print_outputs_length
+        if hasattr(self, "max_tool_threads"):
+            agent_dict["max_tool_threads"] = self.max_tool_threads
         return agent_dict
 
     @classmethod
@@ -938,6 +949,8 @@ You have been provided with these additional arguments, that you can access usin
             args["executor_type"] = agent_dict["executor_type"]
             args["executor_kwargs"] = agent_dict["executor_kwargs"]
             args["max_print_outputs_length"] = agent_dict["max_print_outputs_length"]
+        if cls.__name__ == "ToolCallingAgent":
+            args["max_tool_threads"] = agent_dict.get("max_tool_threads", 1)
         args.update(kwargs)
         return cls(**args)
 
@@ -1005,6 +1018,9 @@ class ToolCallingAgent(MultiStepAgent):
         model (`Callable[[list[dict[str, str]]], ChatMessage]`): Model that will generate the agent's actions.
         prompt_templates ([`~agents.PromptTemplates`], *optional*): Prompt templates.
         planning_interval (`int`, *optional*): Interval at which the agent will run a planning step.
+        max_tool_threads (`int`, default `1`): Maximum number of tool calls of a single model response run
+            concurrently. The default runs them one after the other: only raise it if the tools do not share state.
+            Calls to the same managed agent are always run one after the other.
         **kwargs: Additional keyword arguments.
     """
 
@@ -1014,8 +1030,10 @@ class ToolCallingAgent(MultiStepAgent):
         model: Callable[[List[Dict[str, str]]], ChatMessage],
         prompt_templates: Optional[PromptTemplates] = None,
         planning_interval: Optional[int] = None,
+        max_tool_threads: int = 1,
         **kwargs,
     ):
+        self.max_tool_threads = max_tool_threads
         prompt_templates = prompt_templates or yaml.safe_load(
             importlib.resources.files("smolagents.prompts").joinpath("toolcalling_agent.yaml").read_text()
         )
@@ -1062,6 +1080,16 @@ class ToolCallingAgent(MultiStepAgent):
         except Exception as e:
             raise AgentGenerationError(f"Error in generating tool call with model:\n{e}", self.logger) from e
 
+        tool_calls = [
+            ToolCall(name=tool_call.function.name, arguments=tool_call.function.arguments, id=tool_call.id)
+            for tool_call in model_message.tool_calls
+        ]
+        if len(tool_calls) > 1 and all(tool_call.name != "final_answer" for tool_call in tool_calls):
+            memory_step.tool_calls = tool_calls
+            memory_step.tool_call_observations = self.execute_tool_calls_in_parallel(tool_calls)
+            memory_step.observations = "\n".join(memory_step.tool_call_observations)
+            return None
+
         memory_step.tool_calls = [ToolCall(name=tool_name, arguments=tool_arguments, id=tool_call_id)]
 
         # Execute
@@ -1098,24 +1126,67 @@ class ToolCallingAgent(MultiStepAgent):
             if tool_arguments is None:
                 tool_arguments = {}
             observation = self.execute_tool_call(tool_name, tool_arguments)
-            observation_type = type(observation)
-            if observation_type in [AgentImage, AgentAudio]:
-                if observation_type == AgentImage:
-                    observation_name = "image.png"
-                elif observation_type == AgentAudio:
-                    observation_name = "audio.mp3"
-                # TODO: observation naming could allow for different names of same type
-
-                self.state[observation_name] = observation
-                updated_information = f"Stored '{observation_name}' in memory."
-            else:
-                updated_information = str(observation).strip()
+            memory_step.observations = self.process_tool_observation(observation)
+            return None
+
+    def process_tool_observation(self, observation: Any, tool_call_id: Optional[str] = None) -> str:
+        """
+        Stores image and audio observations in the state, logs the observation and returns it as text.
+        When a `tool_call_id` is given, it is appended to the state key so that the outputs of several calls of a
+        same step do not overwrite each other.
+        """
+        observation_type = type(observation)
+        if observation_type in [AgentImage, AgentAudio]:
+            if observation_type == AgentImage:
+                observation_name = "image.png"
+            elif observation_type == AgentAudio:
+                observation_name = "audio.mp3"
+            if tool_call_id is not None:
+                stem, extension = observation_name.split(".")
+                observation_name = f"{stem}_{tool_call_id}.{extension}"
+
+            self.state[observation_name] = observation
+            updated_information = f"Stored '{observation_name}' in memory."
+        else:
+            updated_information = str(observation).strip()
+        self.logger.log(
+            f"Observations: {updated_information.replace('[', '|')}",  # escape potential rich-tag-like components
+            level=LogLevel.INFO,
+        )
+        return updated_information
+
+    def execute_tool_calls_in_parallel(self, tool_calls: List[ToolCall]) -> List[str]:
+        """
+        Runs the tool calls of a single model response on up to `max_tool_threads` threads, and returns their
+        observations in the order of the calls. A call that fails gets its error as observation, so that it does not
+        discard the results of the other calls.
+        """
+        for tool_call in tool_calls:
             self.logger.log(
-                f"Observations: {updated_information.replace('[', '|')}",  # escape potential rich-tag-like components
+                Panel(Text(f"Calling tool: '{tool_call.name}' with arguments: {tool_call.arguments}")),
                 level=LogLevel.INFO,
             )
-            memory_step.observations = updated_information
-            return None
+        # A managed agent resets its memory at each run, so two calls to the same one must not overlap
+        managed_agent_locks = {name: threading.Lock() for name in self.managed_agents}
+
+        def execute(tool_call: ToolCall) -> Any:
+            lock = managed_agent_locks.get(tool_call.name)
+            try:
+                if lock is None:
+                    return self.execute_tool_call(tool_call.name, tool_call.arguments or {})
+                with lock:
+                    return self.execute_tool_call(tool_call.name, tool_call.arguments or {})
+            except AgentExecutionError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_tool_threads) as executor:
+            observations = list(executor.map(execute, tool_calls))
+        return [
+            f"Error:\n{observation}"
+            if isinstance(observation, AgentExecutionError)
+            else self.process_tool_observation(observation, tool_call_id=tool_call.id)
+            for tool_call, observation in zip(tool_calls, observations)
+        ]
 
 
 class CodeAgent(MultiStepAgent):
@@ -24,6 +24,10 @@ from smolagents.memory import MemoryStep
 from smolagents.utils import _is_package_available
 
 
+# Any non-alphanumeric, non-dash, or non-dot character, to be replaced in uploaded file names
+UNSAFE_FILENAME_CHARACTERS_PATTERN = re.compile(r"[^\w\-.]")
+
+
 def pull_messages_from_step(
     step_log: MemoryStep,
 ):
@@ -129,6 +133,23 @@ def stream_to_gradio(
     additional_args: Optional[dict] = None,
 ):
     """Runs an agent with the given task and streams the messages from the agent as gradio ChatMessages."""
+    for step_messages in stream_step_messages_to_gradio(
+        agent, task, reset_agent_memory=reset_agent_memory, additional_args=additional_args
+    ):
+        yield from step_messages
+
+
+def stream_step_messages_to_gradio(
+    agent,
+    task: str,
+    reset_agent_memory: bool = False,
+    additional_args: Optional[dict] = None,
+):
+    """Runs an agent with the given task and streams the gradio ChatMessages of each step together, as a list.
+
+    The messages of a step are all produced at once: grouping them lets the UI update once per step instead of once
+    per message.
+    """
     if not _is_package_available("gradio"):
         raise ModuleNotFoundError(
             "Please install 'gradio' extra to use the GradioUI: `pip install 'smolagents[gradio]'`"
@@ -147,31 +168,36 @@ def stream_to_gradio(
                 step_log.input_token_count = agent.model.last_input_token_count
                 step_log.output_token_count = agent.model.last_output_token_count
 
-        for message in pull_messages_from_step(
-            step_log,
-        ):
-            yield message
+        step_messages = list(pull_messages_from_step(step_log))
+        if step_messages:
+            yield step_messages
 
     final_answer = step_log  # Last log is the run's final_answer
     final_answer = handle_agent_output_types(final_answer)
 
     if isinstance(final_answer, AgentText):
-        yield gr.ChatMessage(
-            role="assistant",
-            content=f"**Final answer:**\n{final_answer.to_string()}\n",
-        )
+        yield [
+            gr.ChatMessage(
+                role="assistant",
+                content=f"**Final answer:**\n{final_answer.to_string()}\n",
+            )
+        ]
     elif isinstance(final_answer, AgentImage):
-        yield gr.ChatMessage(
-            role="assistant",
-            content={"path": final_answer.to_string(), "mime_type": "image/png"},
-        )
+        yield [
+            gr.ChatMessage(
+                role="assistant",
+                content={"path": final_answer.to_string(), "mime_type": "image/png"},
+            )
+        ]
     elif isinstance(final_answer, AgentAudio):
-        yield gr.ChatMessage(
-            role="assistant",
-            content={"path": final_answer.to_string(), "mime_type": "audio/wav"},
-        )
+        yield [
+            gr.ChatMessage(
+                role="assistant",
+                content={"path": final_answer.to_string(), "mime_type": "audio/wav"},
+            )
+        ]
     else:
-        yield gr.ChatMessage(role="assistant", content=f"**Final answer:** {str(final_answer)}")
+        yield [gr.ChatMessage(role="assistant", content=f"**Final answer:** {str(final_answer)}")]
 
 
 class GradioUI:
@@ -201,8 +227,10 @@ class GradioUI:
             messages.append(gr.ChatMessage(role="user", content=prompt))
             yield messages
 
-            for msg in stream_to_gradio(session_state["agent"], task=prompt, reset_agent_memory=False):
-                messages.append(msg)
+            for step_messages in stream_step_messages_to_gradio(
+                session_state["agent"], task=prompt, reset_agent_memory=False
+            ):
+                messages.extend(step_messages)
                 yield messages
 
             yield messages
@@ -229,9 +257,7 @@ class GradioUI:
 
         # Sanitize file name
         original_name = os.path.basename(file.name)
-        sanitized_name = re.sub(
-            r"[^\w\-.]", "_", original_name
-        )  # Replace any non-alphanumeric, non-dash, or non-dot characters with underscores
+        sanitized_name = UNSAFE_FILENAME_CHARACTERS_PATTERN.sub("_", original_name)
 
         # Save the uploaded file to the specified folder
         file_path = os.path.join(self.file_upload_folder, os.path.basename(sanitized_name))
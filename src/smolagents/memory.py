@@ -1,4 +1,4 @@
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from logging import getLogger
 from typing import TYPE_CHECKING, Any, Dict, List, TypedDict, Union
 
@@ -20,19 +20,24 @@ class Message(TypedDict):
     content: str | list[dict]
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolCall:
     name: str
     arguments: Any
     id: str
+    serialized_arguments: Any = field(default=None, init=False, repr=False, compare=False)
 
     def dict(self):
+        # The step's tool calls are serialized again every time the memory is written to messages: do it only once.
+        # Arguments are final by then, since tool execution is what substitutes state variables in them.
+        if self.serialized_arguments is None:
+            self.serialized_arguments = make_json_serializable(self.arguments)
         return {
             "id": self.id,
             "type": "function",
             "function": {
                 "name": self.name,
-                "arguments": make_json_serializable(self.arguments),
+                "arguments": self.serialized_arguments,
             },
         }
 
@@ -58,6 +63,7 @@ class ActionStep(MemoryStep):
     model_output_message: ChatMessage = None
     model_output: str | None = None
     observations: str | None = None
+    tool_call_observations: List[str] | None = None
     observations_images: List[str] | None = None
     action_output: Any = None
 
@@ -74,6 +80,7 @@ class ActionStep(MemoryStep):
             "model_output_message": self.model_output_message,
             "model_output": self.model_output,
             "observations": self.observations,
+            "tool_call_observations": self.tool_call_observations,
             "action_output": make_json_serializable(self.action_output),
         }
 
@@ -99,7 +106,16 @@ class ActionStep(MemoryStep):
                 )
             )
 
-        if self.observations is not None:
+        if self.tool_call_observations is not None:
+            # Several tools were called in this step: answer each call separately
+            for tool_call, observation in zip(self.tool_calls, self.tool_call_observations):
+                messages.append(
+                    Message(
+                        role=MessageRole.TOOL_RESPONSE,
+                        content=[{"type": "text", "text": f"Call id: {tool_call.id}\nObservation:\n{observation}"}],
+                    )
+                )
+        elif self.observations is not None:
             messages.append(
                 Message(
                     role=MessageRole.TOOL_RESPONSE,
@@ -112,13 +128,11 @@ class ActionStep(MemoryStep):
                 )
             )
         if self.error is not None:
-            error_message = (
-                "Error:\n"
-                + str(self.error)
-                + "\nNow let's retry: take care not to repeat previous errors! If you have retried several times, try a completely different approach.\n"
+            call_id_header = f"Call id: {self.tool_calls[0].id}\n" if self.tool_calls else ""
+            message_content = (
+                f"{call_id_header}Error:\n{self.error}\nNow let's retry: take care not to repeat previous errors! "
+                "If you have retried several times, try a completely different approach.\n"
             )
-            message_content = f"Call id: {self.tool_calls[0].id}\n" if self.tool_calls else ""
-            message_content += error_message
             messages.append(
                 Message(role=MessageRole.TOOL_RESPONSE, content=[{"type": "text", "text": message_content}])
             )
@@ -148,6 +162,16 @@ class PlanningStep(MemoryStep):
     model_output_message_plan: ChatMessage
     plan: str
 
+    def dict(self):
+        # We overwrite the method to avoid the deep copy made by `asdict`
+        return {
+            "model_input_messages": self.model_input_messages,
+            "model_output_message_facts": self.model_output_message_facts,
+            "facts": self.facts,
+            "model_output_message_plan": self.model_output_message_plan,
+            "plan": self.plan,
+        }
+
     def to_messages(self, summary_mode: bool, **kwargs) -> List[Message]:
         messages = []
         messages.append(
@@ -170,6 +194,9 @@ class TaskStep(MemoryStep):
     task: str
     task_images: List[str] | None = None
 
+    def dict(self):
+        return {"task": self.task, "task_images": self.task_images}
+
     def to_messages(self, summary_mode: bool = False, **kwargs) -> List[Message]:
         content = [{"type": "text", "text": f"New task:\n{self.task}"}]
         if self.task_images:
@@ -183,6 +210,9 @@ class TaskStep(MemoryStep):
 class SystemPromptStep(MemoryStep):
     system_prompt: str
 
+    def dict(self):
+        return {"system_prompt": self.system_prompt}
+
     def to_messages(self, summary_mode: bool = False, **kwargs) -> List[Message]:
         if summary_mode:
             return []
@@ -22,7 +22,7 @@ import uuid
 from copy import deepcopy
 from dataclasses import asdict, dataclass
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 from huggingface_hub import InferenceClient
 from huggingface_hub.utils import is_torch_available
@@ -184,6 +184,64 @@ def remove_stop_sequences(content: str, stop_sequences: List[str]) -> str:
     return content
 
 
+def consume_completion_stream(stream, stop_sequences: Optional[List[str]] = None) -> Tuple[ChatMessage, Any]:
+    """
+    Accumulates the text deltas of a streamed OpenAI-style chat completion, and stops reading as soon as one of the
+    stop sequences has been generated: this lets the agent move on to parsing the action without waiting for the
+    provider to finish a generation it would discard anyway.
+
+    Args:
+        stream (`Iterable`): The chunks returned by a completion call made with `stream=True`.
+        stop_sequences (`list[str]`, *optional*): Stop sequences, which are removed from the returned content.
+
+    Returns:
+        `Tuple[ChatMessage, Any]`: The assembled message, and the usage reported by the stream if it was fully
+        consumed (else `None`).
+    """
+    content = ""
+    usage = None
+    max_stop_length = max((len(stop_sequence) for stop_sequence in stop_sequences), default=0) if stop_sequences else 0
+    for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        delta = chunk.choices[0].delta.content
+        content += delta
+        if max_stop_length:
+            # Only the tail can contain a stop sequence that was not already there at the previous chunk
+            search_start = max(0, len(content) - len(delta) - max_stop_length + 1)
+            stop_positions = [content.find(stop_sequence, search_start) for stop_sequence in stop_sequences]
+            stop_positions = [position for position in stop_positions if position != -1]
+            if stop_positions:
+                content = content[: min(stop_positions)]
+                if hasattr(stream, "close"):
+                    stream.close()
+                break
+    return ChatMessage(role=MessageRole.ASSISTANT, content=content), usage
+
+
+def get_stream_token_counts(usage: Any, messages: List[Dict], content: Optional[str]) -> Tuple[int, int]:
+    """
+    Returns the input and output token counts of a streamed completion. When the stream was stopped before the
+    provider sent its usage chunk, the counts are estimated from the text length (about 4 characters per token), so
+    that the step still counts in the monitoring totals.
+
+    Args:
+        usage (`Any`): The usage returned by [`consume_completion_stream`], or `None`.
+        messages (`list[dict]`): The messages sent to the model.
+        content (`str`, *optional*): The content of the assembled message.
+
+    Returns:
+        `Tuple[int, int]`: The input and output token counts.
+    """
+    if usage is not None:
+        return usage.prompt_tokens, usage.completion_tokens
+    logger.info("Usage is unavailable for a stream stopped early: estimating token counts from the text length.")
+    input_characters = len(json.dumps(messages, default=str))
+    return input_characters // 4, len(content or "") // 4
+
+
 def get_clean_message_list(
     message_list: List[Dict[str, str]],
     role_conversions: Dict[MessageRole, MessageRole] = {},
@@ -830,6 +888,9 @@ class LiteLLMModel(Model):
         custom_role_conversions (`dict[str, str]`, *optional*):
             Custom role conversion mapping to convert message roles in others.
             Useful for specific models that do not support specific message roles like "system".
+        stream_outputs (`bool`, *optional*, defaults to `False`):
+            Whether to stream text completions and return as soon as a stop sequence is generated.
+            Calls with tools to call from are never streamed.
         **kwargs:
             Additional keyword arguments to pass to the OpenAI API.
     """
@@ -840,6 +901,7 @@ class LiteLLMModel(Model):
         api_base=None,
         api_key=None,
         custom_role_conversions: Optional[Dict[str, str]] = None,
+        stream_outputs: bool = False,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -847,6 +909,7 @@ class LiteLLMModel(Model):
         self.api_base = api_base
         self.api_key = api_key
         self.custom_role_conversions = custom_role_conversions
+        self.stream_outputs = stream_outputs
         self.flatten_messages_as_text = (
             kwargs.get("flatten_messages_as_text")
             if "flatten_messages_as_text" in kwargs
@@ -882,6 +945,14 @@ class LiteLLMModel(Model):
             **kwargs,
         )
 
+        if self.stream_outputs and tools_to_call_from is None:
+            stream = litellm.completion(**completion_kwargs, stream=True, stream_options={"include_usage": True})
+            message, usage = consume_completion_stream(stream, stop_sequences)
+            self.last_input_token_count, self.last_output_token_count = get_stream_token_counts(
+                usage, completion_kwargs["messages"], message.content
+            )
+            return message
+
         response = litellm.completion(**completion_kwargs)
 
         self.last_input_token_count = response.usage.prompt_tokens
@@ -915,6 +986,9 @@ class OpenAIServerModel(Model):
         custom_role_conversions (`dict[str, str]`, *optional*):
             Custom role conversion mapping to convert message roles in others.
             Useful for specific models that do not support specific message roles like "system".
+        stream_outputs (`bool`, *optional*, defaults to `False`):
+            Whether to stream text completions and return as soon as a stop sequence is generated.
+            Calls with tools to call from are never streamed.
         **kwargs:
             Additional keyword arguments to pass to the OpenAI API.
     """
@@ -928,6 +1002,7 @@ class OpenAIServerModel(Model):
         project: Optional[str] | None = None,
         client_kwargs: Optional[Dict[str, Any]] = None,
         custom_role_conversions: Optional[Dict[str, str]] = None,
+        stream_outputs: bool = False,
         **kwargs,
     ):
         try:
@@ -947,6 +1022,7 @@ class OpenAIServerModel(Model):
             **(client_kwargs or {}),
         )
         self.custom_role_conversions = custom_role_conversions
+        self.stream_outputs = stream_outputs
 
     def __call__(
         self,
@@ -966,6 +1042,16 @@ class OpenAIServerModel(Model):
             convert_images_to_image_urls=True,
             **kwargs,
         )
+        if self.stream_outputs and tools_to_call_from is None:
+            stream = self.client.chat.completions.create(
+                **completion_kwargs, stream=True, stream_options={"include_usage": True}
+            )
+            message, usage = consume_completion_stream(stream, stop_sequences)
+            self.last_input_token_count, self.last_output_token_count = get_stream_token_counts(
+                usage, completion_kwargs["messages"], message.content
+            )
+            return message
+
         response = self.client.chat.completions.create(**completion_kwargs)
         self.last_input_token_count = response.usage.prompt_tokens
         self.last_output_token_count = response.usage.completion_tokens
@@ -82,11 +82,14 @@ class LogLevel(IntEnum):
 
 YELLOW_HEX = "#d4b702"
 
+# Detecting the terminal capabilities is done once, for all loggers
+default_console = Console()
+
 
 class AgentLogger:
-    def __init__(self, level: LogLevel = LogLevel.INFO):
+    def __init__(self, level: LogLevel = LogLevel.INFO, console: Console | None = None):
         self.level = level
-        self.console = Console()
+        self.console = console if console is not None else default_console
 
     def log(self, *args, level: str | LogLevel = LogLevel.INFO, **kwargs) -> None:
         """Logs a message to the console.
@@ -15,16 +15,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import base64
+import hashlib
 import json
 import pickle
 import re
+import tarfile
 import time
+import uuid
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from PIL import Image
+from requests.adapters import HTTPAdapter
 
 from .local_python_executor import PythonExecutor
 from .monitoring import LogLevel
@@ -39,12 +43,15 @@ except ModuleNotFoundError:
     pass
 
 
+FINAL_ANSWER_PATTERN = re.compile(r"^final_answer\((.*)\)$")
+
+
 class RemotePythonExecutor(PythonExecutor):
     def __init__(self, additional_imports: List[str], logger):
         self.additional_imports = additional_imports
         self.logger = logger
         self.logger.log("Initializing executor, hold on...")
-        self.final_answer_pattern = re.compile(r"^final_answer\((.*)\)$")
+        self.final_answer_pattern = FINAL_ANSWER_PATTERN
         self.installed_packages = []
 
     def run_code_raise_errors(self, code: str, return_final_answer: bool = False) -> Tuple[Any, str]:
@@ -60,16 +67,20 @@ class RemotePythonExecutor(PythonExecutor):
                     packages_to_install.add(package)
                     self.installed_packages.append(package)
 
-        execution = self.run_code_raise_errors(
-            f"!pip install {' '.join(packages_to_install)}\n" + tool_definition_code
-        )
+        if packages_to_install:
+            # Only start pip when there is something to install
+            tool_definition_code = (
+                f"!pip install --disable-pip-version-check {' '.join(packages_to_install)}\n" + tool_definition_code
+            )
+        execution = self.run_code_raise_errors(tool_definition_code)
         self.logger.log(execution[1])
 
     def send_variables(self, variables: dict):
         """
         Send variables to the kernel namespace using pickle.
         """
-        pickled_vars = base64.b64encode(pickle.dumps(variables)).decode()
+        # Protocol 5 (Python 3.8+ on both sides) is faster and more compact than the default, especially on arrays
+        pickled_vars = base64.b64encode(pickle.dumps(variables, protocol=5)).decode()
         code = f"""
 import pickle, base64
 vars_dict = pickle.loads(base64.b64decode('{pickled_vars}'))
@@ -85,7 +96,7 @@ locals().update(vars_dict)
 
     def install_packages(self, additional_imports: List[str]):
         additional_imports = additional_imports + ["smolagents"]
-        self.run_code_raise_errors(f"!pip install {' '.join(additional_imports)}")
+        self.run_code_raise_errors(f"!pip install --disable-pip-version-check {' '.join(additional_imports)}")
         return additional_imports
 
 
@@ -145,6 +156,11 @@ class E2BExecutor(RemotePythonExecutor):
             return None, execution_logs
 
 
+VARIABLES_DIRECTORY = "/tmp"
+VARIABLES_FILE_NAME = "smolagents_variables.pkl"
+GATEWAY_STARTUP_TIMEOUT = 30
+
+
 class DockerExecutor(RemotePythonExecutor):
     """
     Executes Python code using Jupyter Kernel Gateway in a Docker container.
@@ -156,9 +172,15 @@ class DockerExecutor(RemotePythonExecutor):
         logger,
         host: str = "127.0.0.1",
         port: int = 8888,
+        container_run_kwargs: Optional[Dict[str, Any]] = None,
     ):
         """
         Initialize the Docker-based Jupyter Kernel Gateway executor.
+
+        Args:
+            container_run_kwargs (`dict`, *optional*): Additional arguments passed to `docker.containers.run`, for
+                instance `{"security_opt": ["seccomp=unconfined"]}` to speed up container startup where the isolation
+                it removes is not needed.
         """
         super().__init__(additional_imports, logger)
         try:
@@ -170,6 +192,9 @@ class DockerExecutor(RemotePythonExecutor):
             )
         self.host = host
         self.port = port
+        # The Jupyter session stays the same for the whole connection: message IDs only need a per-session counter
+        self.session_id = uuid.uuid4().hex
+        self.message_count = 0
 
         # Initialize Docker
         try:
@@ -179,7 +204,6 @@ class DockerExecutor(RemotePythonExecutor):
 
         # Build and start container
         try:
-            self.logger.log("Building Docker image...", level=LogLevel.INFO)
             dockerfile_path = Path(__file__).parent / "Dockerfile"
             if not dockerfile_path.exists():
                 with open(dockerfile_path, "w") as f:
@@ -191,27 +215,50 @@ RUN pip install jupyter_client notebook
 EXPOSE 8888
 CMD ["jupyter", "kernelgateway", "--KernelGatewayApp.ip='0.0.0.0'", "--KernelGatewayApp.port=8888", "--KernelGatewayApp.allow_origin='*'"]
 """)
-            _, build_logs = self.client.images.build(
-                path=str(dockerfile_path.parent), dockerfile=str(dockerfile_path), tag="jupyter-kernel"
-            )
-            self.logger.log(build_logs, level=LogLevel.DEBUG)
+            # Tag the image with the Dockerfile hash, so that it is only built again when the Dockerfile changes
+            dockerfile_hash = hashlib.sha256(dockerfile_path.read_bytes()).hexdigest()[:12]
+            image_tag = f"jupyter-kernel:{dockerfile_hash}"
+            try:
+                self.client.images.get(image_tag)
+                self.logger.log(f"Using existing Docker image {image_tag}", level=LogLevel.INFO)
+            except docker.errors.ImageNotFound:
+                self.logger.log("Building Docker image...", level=LogLevel.INFO)
+                _, build_logs = self.client.images.build(
+                    path=str(dockerfile_path.parent), dockerfile=str(dockerfile_path), tag=image_tag
+                )
+                self.logger.log(build_logs, level=LogLevel.DEBUG)
 
             self.logger.log(f"Starting container on {host}:{port}...", level=LogLevel.INFO)
             self.container = self.client.containers.run(
-                "jupyter-kernel", ports={"8888/tcp": (host, port)}, detach=True
+                image_tag, ports={"8888/tcp": (host, port)}, detach=True, **(container_run_kwargs or {})
             )
 
-            retries = 0
-            while self.container.status != "running" and retries < 5:
-                self.logger.log(f"Container status: {self.container.status}, waiting...", level=LogLevel.INFO)
-                time.sleep(1)
-                self.container.reload()
-                retries += 1
-
             self.base_url = f"http://{host}:{port}"
+            # Kernel management calls all go to the same gateway: keep their connection alive between calls
+            self.session = requests.Session()
+            self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+            # Poll the gateway with a growing delay rather than sleeping a fixed time: it is usually up in well under
+            # a second, and the kernel can only be created once it answers
+            deadline = time.monotonic() + GATEWAY_STARTUP_TIMEOUT
+            delay = 0.05
+            while True:
+                try:
+                    if self.session.get(f"{self.base_url}/api/kernels", timeout=0.5).status_code == 200:
+                        break
+                except requests.RequestException:
+                    pass
+                if time.monotonic() > deadline:
+                    self.container.reload()
+                    raise RuntimeError(
+                        f"Kernel gateway did not start within {GATEWAY_STARTUP_TIMEOUT}s "
+                        f"(container status: {self.container.status})"
+                    )
+                time.sleep(delay)
+                delay = min(delay * 1.5, 0.5)
 
             # Create new kernel via HTTP
-            r = requests.post(f"{self.base_url}/api/kernels")
+            r = self.session.post(f"{self.base_url}/api/kernels")
             if r.status_code != 201:
                 error_details = {
                     "status_code": r.status_code,
@@ -239,6 +286,27 @@ CMD ["jupyter", "kernelgateway", "--KernelGatewayApp.ip='0.0.0.0'", "--KernelGat
             self.cleanup()
             raise RuntimeError(f"Failed to initialize Jupyter kernel: {e}") from e
 
+    def send_variables(self, variables: dict):
+        """
+        Send variables to the kernel namespace, as a pickle file copied directly into the container: this skips the
+        base64 encoding and the parsing of the payload as source code.
+        """
+        pickled_vars = pickle.dumps(variables, protocol=5)
+        tar_buffer = BytesIO()
+        with tarfile.open(fileobj=tar_buffer, mode="w") as tar:
+            tar_info = tarfile.TarInfo(name=VARIABLES_FILE_NAME)
+            tar_info.size = len(pickled_vars)
+            tar.addfile(tar_info, BytesIO(pickled_vars))
+        self.container.put_archive(VARIABLES_DIRECTORY, tar_buffer.getvalue())
+        variables_path = f"{VARIABLES_DIRECTORY}/{VARIABLES_FILE_NAME}"
+        code = f"""
+import os, pickle
+with open('{variables_path}', 'rb') as f:
+    locals().update(pickle.load(f))
+os.remove('{variables_path}')
+"""
+        self.run_code_raise_errors(code)
+
     def run_code_raise_errors(self, code_action: str, return_final_answer: bool = False) -> Tuple[Any, str]:
         """
         Execute code and return result based on whether it's a final answer.
@@ -246,12 +314,17 @@ CMD ["jupyter", "kernelgateway", "--KernelGatewayApp.ip='0.0.0.0'", "--KernelGat
         try:
             if return_final_answer:
                 match = self.final_answer_pattern.match(code_action)
-                if match:
-                    result_expr = match.group(1)
-                    wrapped_code = f"""
-    import pickle, base64
+                if match is None:
+                    raise ValueError(f"Code is not a final answer call: {code_action}")
+                result_expr = match.group(1)
+                # Plain scalars round-trip exactly through JSON, which is cheaper than pickle + base64
+                wrapped_code = f"""
+    import pickle, base64, json
     _result = {result_expr}
-    print("RESULT_PICKLE:" + base64.b64encode(pickle.dumps(_result)).decode())
+    if _result is None or type(_result) in (str, int, float, bool):
+        print("RESULT_JSON:" + json.dumps(_result))
+    else:
+        print("RESULT_PICKLE:" + base64.b64encode(pickle.dumps(_result, protocol=5)).decode())
     """
             else:
                 wrapped_code = code_action
@@ -264,8 +337,15 @@ CMD ["jupyter", "kernelgateway", "--KernelGatewayApp.ip='0.0.0.0'", "--KernelGat
             result = None
             waiting_for_idle = False
 
+            # Quoted, so that another request's ID that merely starts with ours (like "<session>-10" for
+            # "<session>-1") does not match
+            quoted_msg_id = json.dumps(msg_id)
             while True:
-                msg = json.loads(self.ws.recv())
+                raw_msg = self.ws.recv()
+                # Cheap check before parsing: messages from other requests cannot contain our quoted message ID
+                if quoted_msg_id not in raw_msg:
+                    continue
+                msg = json.loads(raw_msg)
                 msg_type = msg.get("msg_type", "")
                 parent_msg_id = msg.get("parent_header", {}).get("msg_id")
 
@@ -275,7 +355,10 @@ CMD ["jupyter", "kernelgateway", "--KernelGatewayApp.ip='0.0.0.0'", "--KernelGat
 
                 if msg_type == "stream":
                     text = msg["content"]["text"]
-                    if return_final_answer and text.startswith("RESULT_PICKLE:"):
+                    if return_final_answer and text.startswith("RESULT_JSON:"):
+                        result = json.loads(text[len("RESULT_JSON:") :])
+                        waiting_for_idle = True
+                    elif return_final_answer and text.startswith("RESULT_PICKLE:"):
                         pickle_data = text[len("RESULT_PICKLE:") :].strip()
                         result = pickle.loads(base64.b64decode(pickle_data))
                         waiting_for_idle = True
@@ -296,17 +379,16 @@ CMD ["jupyter", "kernelgateway", "--KernelGatewayApp.ip='0.0.0.0'", "--KernelGat
 
     def _send_execute_request(self, code: str) -> str:
         """Send code execution request to kernel."""
-        import uuid
-
         # Generate a unique message ID
-        msg_id = str(uuid.uuid4())
+        self.message_count += 1
+        msg_id = f"{self.session_id}-{self.message_count}"
 
         # Create execute request
         execute_request = {
             "header": {
                 "msg_id": msg_id,
                 "username": "anonymous",
-                "session": str(uuid.uuid4()),
+                "session": self.session_id,
                 "msg_type": "execute_request",
                 "version": "5.0",
             },
@@ -329,9 +411,11 @@ CMD ["jupyter", "kernelgateway", "--KernelGatewayApp.ip='0.0.0.0'", "--KernelGat
         try:
             if hasattr(self, "container"):
                 self.logger.log(f"Stopping and removing container {self.container.short_id}...", level=LogLevel.INFO)
-                self.container.stop()
-                self.container.remove()
+                # The container is discarded: kill and remove it in one call rather than waiting for a graceful stop
+                self.container.remove(force=True)
                 self.logger.log("Container cleanup completed", level=LogLevel.INFO)
+            if hasattr(self, "session"):
+                self.session.close()
         except Exception as e:
             self.logger.log_error(f"Error during cleanup: {e}")
 
@@ -1032,18 +1032,9 @@ class PipelineTool(Tool):
         return decoded_outputs
 
 
-def get_tools_definition_code(tools: Dict[str, Tool]) -> str:
-    tool_codes = []
-    for tool in tools.values():
-        validate_tool_attributes(tool.__class__, check_imports=False)
-        tool_code = instance_to_source(tool, base_cls=Tool)
-        tool_code = tool_code.replace("from smolagents.tools import Tool", "")
-        tool_code += f"\n\n{tool.name} = {tool.__class__.__name__}()\n"
-        tool_codes.append(tool_code)
-
-    tool_definition_code = "\n".join([f"import {module}" for module in BASE_BUILTIN_MODULES])
-    tool_definition_code += textwrap.dedent(
-        """
+# The header of the tool definitions never changes: build it once
+TOOL_DEFINITION_CODE_HEADER = "\n".join([f"import {module}" for module in BASE_BUILTIN_MODULES]) + textwrap.dedent(
+    """
     from typing import Any
 
     class Tool:
@@ -1053,9 +1044,17 @@ def get_tools_definition_code(tools: Dict[str, Tool]) -> str:
         def forward(self, *args, **kwargs):
             pass # to be implemented in child class
     """
-    )
-    tool_definition_code += "\n\n".join(tool_codes)
-    return tool_definition_code
+)
+
+
+def get_tools_definition_code(tools: Dict[str, Tool]) -> str:
+    tool_codes = []
+    for tool in tools.values():
+        validate_tool_attributes(tool.__class__, check_imports=False)
+        tool_code = instance_to_source(tool, base_cls=Tool)
+        tool_code = tool_code.replace("from smolagents.tools import Tool", "")
+        tool_codes.append(f"{tool_code}\n\n{tool.name} = {tool.__class__.__name__}()\n")
+    return TOOL_DEFINITION_CODE_HEADER + "\n\n".join(tool_codes)
 
 
 __all__ = [
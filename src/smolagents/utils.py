@@ -424,12 +424,18 @@ def get_source(obj) -> str:
 
 def encode_image_base64(image):
     buffered = BytesIO()
-    image.save(buffered, format="PNG")
+    if image.format == "JPEG":
+        # Photos and screenshots decoded from JPEG stay JPEG: as PNG they would be several times larger to upload
+        image.save(buffered, format="JPEG", quality=85)
+    else:
+        image.save(buffered, format="PNG")
     return base64.b64encode(buffered.getvalue()).decode("utf-8")
 
 
 def make_image_url(base64_image):
-    return f"data:image/png;base64,{base64_image}"
+    # JPEG data starts with the bytes FF D8 FF, which are encoded as "/9j/"
+    mime_type = "image/jpeg" if base64_image.startswith("/9j/") else "image/png"
+    return f"data:{mime_type};base64,{base64_image}"
 
 
 def make_init_file(folder: str):
@@ -1,12 +1,12 @@
 import argparse
+import base64
 from io import BytesIO
-from time import sleep
 
 import helium
 from dotenv import load_dotenv
 from PIL import Image
 from selenium import webdriver
-from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.keys import Keys
 
 from smolagents import CodeAgent, DuckDuckGoSearchTool, tool
@@ -48,18 +48,48 @@ def parse_arguments():
     return parser.parse_args()
 
 
+# Resolves once the page is loaded, its fonts are ready, its finite animations are over, and a frame was painted
+WAIT_FOR_SETTLED_PAGE_SCRIPT = """
+const done = arguments[arguments.length - 1];
+const loaded = document.readyState === "complete"
+    ? Promise.resolve()
+    : new Promise((resolve) => window.addEventListener("load", resolve, { once: true }));
+const animations = document.getAnimations()
+    .filter((animation) => animation.effect && animation.effect.getComputedTiming().endTime !== Infinity)
+    .map((animation) => animation.finished.catch(() => {}));
+Promise.all([loaded, document.fonts.ready, ...animations])
+    .then(() => requestAnimationFrame(() => requestAnimationFrame(() => done())));
+"""
+MAX_SETTLE_TIME = 1.0
+
+
+def wait_for_settled_page(driver) -> None:
+    """Waits for JavaScript animations to end before taking a screenshot, for at most `MAX_SETTLE_TIME` seconds."""
+    # The script timeout applies to every script of the session: only shorten it for this wait
+    script_timeout = driver.timeouts.script
+    driver.set_script_timeout(MAX_SETTLE_TIME)
+    try:
+        driver.execute_async_script(WAIT_FOR_SETTLED_PAGE_SCRIPT)
+    except TimeoutException:
+        pass
+    finally:
+        driver.set_script_timeout(script_timeout)
+
+
 def save_screenshot(memory_step: ActionStep, agent: CodeAgent) -> None:
-    sleep(1.0)  # Let JavaScript animations happen before taking the screenshot
     driver = helium.get_driver()
     current_step = memory_step.step_number
     if driver is not None:
+        wait_for_settled_page(driver)
         for previous_memory_step in agent.memory.steps:  # Remove previous screenshots from logs for lean processing
             if isinstance(previous_memory_step, ActionStep) and previous_memory_step.step_number <= current_step - 2:
                 previous_memory_step.observations_images = None
-        png_bytes = driver.get_screenshot_as_png()
-        image = Image.open(BytesIO(png_bytes))
+        # A JPEG capture is much faster to encode in Chrome and to decode here than the PNG from get_screenshot_as_png
+        screenshot = driver.execute_cdp_cmd("Page.captureScreenshot", {"format": "jpeg", "quality": 80})
+        image = Image.open(BytesIO(base64.b64decode(screenshot["data"])))
+        image.load()  # Decode now: the image owns its pixels, so it persists without being copied
         print(f"Captured a browser screenshot: {image.size} pixels")
-        memory_step.observations_images = [image.copy()]  # Create a copy to ensure it persists, important!
+        memory_step.observations_images = [image]
 
     # Update observations with current URL
     url_info = f"Current url: {driver.current_url}"
@@ -69,6 +99,27 @@ def save_screenshot(memory_step: ActionStep, agent: CodeAgent) -> None:
     return
 
 
+# Walks the text nodes of the page once, which is much faster than an XPath `contains(text(), ...)` on large pages,
+# and receives the searched text as an argument, so quotes in it cannot break the query.
+# It scrolls to the nth matching element and returns the number of matches, all in a single round trip.
+SCROLL_TO_NTH_ELEMENT_CONTAINING_TEXT_SCRIPT = """
+const [text, nthResult] = arguments;
+const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+const elements = new Set();
+let node;
+while ((node = walker.nextNode())) {
+    if (node.nodeValue.includes(text)) {
+        elements.add(node.parentElement);
+    }
+}
+const matches = Array.from(elements);
+if (nthResult >= 1 && nthResult <= matches.length) {
+    matches[nthResult - 1].scrollIntoView(true);
+}
+return matches.length;
+"""
+
+
 @tool
 def search_item_ctrl_f(text: str, nth_result: int = 1) -> str:
     """
@@ -77,20 +128,19 @@ def search_item_ctrl_f(text: str, nth_result: int = 1) -> str:
         text: The text to search for
         nth_result: Which occurrence to jump to (default: 1)
     """
-    elements = driver.find_elements(By.XPATH, f"//*[contains(text(), '{text}')]")
-    if nth_result > len(elements):
-        raise Exception(f"Match n°{nth_result} not found (only {len(elements)} matches found)")
-    result = f"Found {len(elements)} matches for '{text}'."
-    elem = elements[nth_result - 1]
-    driver.execute_script("arguments[0].scrollIntoView(true);", elem)
-    result += f"Focused on element {nth_result} of {len(elements)}"
+    driver = helium.get_driver()
+    n_matches = driver.execute_script(SCROLL_TO_NTH_ELEMENT_CONTAINING_TEXT_SCRIPT, text, nth_result)
+    if nth_result > n_matches:
+        raise Exception(f"Match n°{nth_result} not found (only {n_matches} matches found)")
+    result = f"Found {n_matches} matches for '{text}'."
+    result += f"Focused on element {nth_result} of {n_matches}"
     return result
 
 
 @tool
 def go_back() -> None:
     """Goes back to previous page."""
-    driver.back()
+    helium.get_driver().back()
 
 
 @tool
@@ -98,32 +148,29 @@ def close_popups() -> str:
     """
     Closes any visible modal or pop-up on the page. Use this to dismiss pop-up windows! This does not work on cookie consent banners.
     """
-    webdriver.ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+    webdriver.ActionChains(helium.get_driver()).send_keys(Keys.ESCAPE).perform()
 
 
 def initialize_driver():
-    """Initialize the Selenium WebDriver."""
+    """Initialize the Selenium WebDriver, or reuse the browser already started by helium if it is still open."""
+    driver = helium.get_driver()
+    if driver is not None:
+        try:
+            driver.current_url  # Raises if the browser was closed
+            return driver
+        except WebDriverException:
+            pass
     chrome_options = webdriver.ChromeOptions()
     chrome_options.add_argument("--force-device-scale-factor=1")
     chrome_options.add_argument("--window-size=1000,1350")
     chrome_options.add_argument("--disable-pdf-viewer")
     chrome_options.add_argument("--window-position=0,0")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--disable-features=Translate")
     return helium.start_chrome(headless=False, options=chrome_options)
 
 
-def initialize_agent(model):
-    """Initialize the CodeAgent with the specified model."""
-    return CodeAgent(
-        tools=[DuckDuckGoSearchTool(), go_back, close_popups, search_item_ctrl_f],
-        model=model,
-        additional_authorized_imports=["helium"],
-        step_callbacks=[save_screenshot],
-        max_steps=20,
-        verbosity_level=2,
-    )
-
-
-helium_instructions = """
+HELIUM_INSTRUCTIONS = """
 Use your web_search tool when you want to get Google search results.
 Then you can use helium to access websites. Don't use helium for Google search, only for navigating websites!
 Don't bother about the helium driver, it's already managed.
@@ -187,6 +234,22 @@ When you have modals or cookie banners on screen, you should get rid of them bef
 """
 
 
+def initialize_agent(model):
+    """Initialize the CodeAgent with the specified model."""
+    agent = CodeAgent(
+        tools=[DuckDuckGoSearchTool(), go_back, close_popups, search_item_ctrl_f],
+        model=model,
+        additional_authorized_imports=["helium"],
+        step_callbacks=[save_screenshot],
+        max_steps=20,
+        verbosity_level=2,
+    )
+    # The instructions go in the system prompt rather than the task: this keeps them at the start of every request,
+    # in the prefix that providers can serve from their prompt cache
+    agent.prompt_templates["system_prompt"] += "\n" + HELIUM_INSTRUCTIONS
+    return agent
+
+
 def main():
     # Load environment variables
     load_dotenv()
@@ -197,13 +260,12 @@ def main():
     # Initialize the model based on the provided arguments
     model = load_model(args.model_type, args.model_id)
 
-    global driver
-    driver = initialize_driver()
+    initialize_driver()
     agent = initialize_agent(model)
 
     # Run the agent with the provided prompt
     agent.python_executor("from helium import *", agent.state)
-    agent.run(args.prompt + helium_instructions)
+    agent.run(args.prompt)
 
 
 if __name__ == "__main__":
@@ -314,6 +314,99 @@ class AgentTests(unittest.TestCase):
         assert "7.2904" in agent.memory.steps[1].observations
         assert agent.memory.steps[2].model_output is None
 
+    def test_toolcalling_agent_runs_multiple_tool_calls_in_parallel(self):
+        class FakeToolCallModelParallel:
+            def __call__(self, messages, tools_to_call_from=None, stop_sequences=None, grammar=None):
+                if len(messages) < 3:
+                    return ChatMessage(
+                        role="assistant",
+                        content="",
+                        tool_calls=[
+                            ChatMessageToolCall(
+                                id=f"call_{i}",
+                                type="function",
+                                function=ChatMessageToolCallDefinition(
+                                    name="python_interpreter", arguments={"code": f"{i}*3"}
+                                ),
+                            )
+                            for i in range(1, 3)
+                        ],
+                    )
+                return ChatMessage(
+                    role="assistant",
+                    content="",
+                    tool_calls=[
+                        ChatMessageToolCall(
+                            id="call_3",
+                            type="function",
+                            function=ChatMessageToolCallDefinition(name="final_answer", arguments={"answer": "done"}),
+                        )
+                    ],
+                )
+
+        agent = ToolCallingAgent(
+            tools=[PythonInterpreterTool()], model=FakeToolCallModelParallel(), max_tool_threads=2
+        )
+        output = agent.run("Compute 1*3 and 2*3.")
+        assert output == "done"
+        assert [tool_call.id for tool_call in agent.memory.steps[1].tool_calls] == ["call_1", "call_2"]
+        tool_call_observations = agent.memory.steps[1].tool_call_observations
+        assert "3" in tool_call_observations[0] and "6" in tool_call_observations[1]
+        tool_responses = [
+            message["content"][0]["text"]
+            for message in agent.memory.steps[1].to_messages()
+            if message["role"] == MessageRole.TOOL_RESPONSE
+        ]
+        assert [response.split("\n")[0] for response in tool_responses] == ["Call id: call_1", "Call id: call_2"]
+
+    def test_toolcalling_agent_keeps_other_results_when_a_parallel_tool_call_fails(self):
+        class FakeToolCallModelParallelWithError:
+            def __call__(self, messages, tools_to_call_from=None, stop_sequences=None, grammar=None):
+                if len(messages) < 3:
+                    tool_calls = [
+                        ("call_1", "python_interpreter", {"code": "1*3"}),
+                        ("call_2", "unknown_tool", {}),
+                        ("call_3", "python_interpreter", {"code": "3*3"}),
+                    ]
+                else:
+                    tool_calls = [("call_4", "final_answer", {"answer": "done"})]
+                return ChatMessage(
+                    role="assistant",
+                    content="",
+                    tool_calls=[
+                        ChatMessageToolCall(
+                            id=tool_call_id,
+                            type="function",
+                            function=ChatMessageToolCallDefinition(name=name, arguments=arguments),
+                        )
+                        for tool_call_id, name, arguments in tool_calls
+                    ],
+                )
+
+        agent = ToolCallingAgent(
+            tools=[PythonInterpreterTool()], model=FakeToolCallModelParallelWithError(), max_tool_threads=4
+        )
+        output = agent.run("Compute 1*3 and 3*3.")
+        assert output == "done"
+        step = agent.memory.steps[1]
+        assert step.error is None
+        assert "3" in step.tool_call_observations[0]
+        assert (
+            step.tool_call_observations[1].startswith("Error:\n") and "unknown_tool" in step.tool_call_observations[1]
+        )
+        assert "9" in step.tool_call_observations[2]
+        tool_responses = [
+            message["content"][0]["text"]
+            for message in step.to_messages()
+            if message["role"] == MessageRole.TOOL_RESPONSE
+        ]
+        assert [response.split("\n")[0] for response in tool_responses] == [
+            "Call id: call_1",
+            "Call id: call_2",
+            "Call id: call_3",
+        ]
+        assert "unknown_tool" in tool_responses[1]
+
     def test_toolcalling_agent_handles_image_tool_outputs(self):
         from PIL import Image
 
@@ -912,6 +1005,7 @@ class MultiAgentsTests(unittest.TestCase):
             tools=[DuckDuckGoSearchTool(max_results=2), VisitWebpageTool()],
             name="web_agent",
             description="does web searches",
+            max_tool_threads=3,
         )
         code_agent = CodeAgent(model=model, tools=[], name="useless", description="does nothing in particular")
 
@@ -966,6 +1060,7 @@ class MultiAgentsTests(unittest.TestCase):
             agent2.managed_agents["web_agent"].tools["web_search"].max_results == 10
         )  # For now tool init parameters are forgotten
         assert agent2.model.kwargs["temperature"] == pytest.approx(0.5)
+        assert agent2.managed_agents["web_agent"].max_tool_threads == 3
 
     def test_multiagents(self):
         class FakeModelMultiagentsManagerAgent:
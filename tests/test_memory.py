@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 
 from smolagents.agents import ToolCall
@@ -12,6 +14,7 @@ from smolagents.memory import (
     SystemPromptStep,
     TaskStep,
 )
+from smolagents.utils import make_json_serializable
 
 
 class TestAgentMemory:
@@ -113,6 +116,37 @@ def test_planning_step_to_messages():
             assert "text" in content
 
 
+def test_tool_call_dict_serializes_arguments_once():
+    tool_call = ToolCall(id="id", name="get_weather", arguments={"location": "Paris"})
+    with patch("smolagents.memory.make_json_serializable", wraps=make_json_serializable) as mock_serialize:
+        assert tool_call.dict() == tool_call.dict()
+    assert tool_call.dict()["function"]["arguments"] == {"location": "Paris"}
+    assert mock_serialize.call_count == 1
+
+
+def test_planning_step_dict():
+    model_output_message_facts = ChatMessage(role=MessageRole.ASSISTANT, content="Facts")
+    planning_step = PlanningStep(
+        model_input_messages=[Message(role=MessageRole.USER, content="Hello")],
+        model_output_message_facts=model_output_message_facts,
+        facts="These are facts.",
+        model_output_message_plan=ChatMessage(role=MessageRole.ASSISTANT, content="Plan"),
+        plan="This is a plan.",
+    )
+    planning_step_dict = planning_step.dict()
+    assert list(planning_step_dict) == [
+        "model_input_messages",
+        "model_output_message_facts",
+        "facts",
+        "model_output_message_plan",
+        "plan",
+    ]
+    assert planning_step_dict["model_output_message_facts"] is model_output_message_facts
+    assert planning_step_dict["plan"] == "This is a plan."
+    assert TaskStep(task="This is a task.").dict() == {"task": "This is a task.", "task_images": None}
+    assert SystemPromptStep(system_prompt="Prompt").dict() == {"system_prompt": "Prompt"}
+
+
 def test_task_step_to_messages():
     task_step = TaskStep(task="This is a task.", task_images=["task_image1.png"])
     messages = task_step.to_messages(summary_mode=False)
@@ -30,6 +30,7 @@ from smolagents.models import (
     MLXModel,
     OpenAIServerModel,
     TransformersModel,
+    consume_completion_stream,
     get_clean_message_list,
     get_tool_json_schema,
     parse_json_if_needed,
@@ -178,6 +179,24 @@ class TestLiteLLMModel:
         model = LiteLLMModel(model_id="fal/llama-3.3-70b", flatten_messages_as_text=True)
         assert model.flatten_messages_as_text
 
+    def test_stream_outputs_stops_at_stop_sequence_and_estimates_token_counts(self):
+        model = LiteLLMModel(model_id="openai/gpt-4o", stream_outputs=True)
+        stream = MagicMock()
+        stream.__iter__.return_value = iter(
+            [_make_stream_chunk("Code:\n```py\nprint(1)\n```<end_code>"), _make_stream_chunk("unreachable")]
+        )
+        messages = [{"role": "user", "content": [{"type": "text", "text": "Test message"}]}]
+        with patch("litellm.completion", return_value=stream) as mock_completion:
+            message = model(messages, stop_sequences=["<end_code>"])
+        call_kwargs = mock_completion.call_args.kwargs
+        assert call_kwargs["stream"] is True
+        assert call_kwargs["stream_options"] == {"include_usage": True}
+        assert message.content == "Code:\n```py\nprint(1)\n```"
+        stream.close.assert_called_once()
+        # The stream was stopped before its usage chunk: token counts are estimated instead of left unset
+        assert model.last_input_token_count > 0
+        assert model.last_output_token_count > 0
+
 
 class TestOpenAIServerModel:
     def test_client_kwargs_passed_correctly(self):
@@ -202,6 +221,34 @@ class TestOpenAIServerModel:
             )
 
 
+def _make_stream_chunk(content=None, usage=None):
+    delta = MagicMock(content=content)
+    return MagicMock(choices=[MagicMock(delta=delta)] if content is not None else [], usage=usage)
+
+
+def test_consume_completion_stream_stops_at_stop_sequence():
+    chunks = [
+        _make_stream_chunk("Thought: go\nCode:\n```py\nprint(1)\n```<end"),
+        _make_stream_chunk("_code>\nObservation: should not be read"),
+        _make_stream_chunk("unreachable"),
+    ]
+    stream = MagicMock()
+    stream.__iter__.return_value = iter(chunks)
+    message, usage = consume_completion_stream(stream, stop_sequences=["<end_code>", "Observation:"])
+    assert message.content == "Thought: go\nCode:\n```py\nprint(1)\n```"
+    assert usage is None
+    stream.close.assert_called_once()
+
+
+def test_consume_completion_stream_returns_usage_when_fully_consumed():
+    usage = MagicMock(prompt_tokens=10, completion_tokens=3)
+    chunks = [_make_stream_chunk("Hello"), _make_stream_chunk(" world"), _make_stream_chunk(usage=usage)]
+    message, returned_usage = consume_completion_stream(iter(chunks), stop_sequences=["<end_code>"])
+    assert message.content == "Hello world"
+    assert message.role == MessageRole.ASSISTANT
+    assert returned_usage is usage
+
+
 def test_get_clean_message_list_basic():
     messages = [
         {"role": "user", "content": [{"type": "text", "text": "Hello!"}]},
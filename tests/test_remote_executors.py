@@ -1,10 +1,9 @@
-import logging
-from unittest import TestCase
+from unittest import SkipTest, TestCase
 from unittest.mock import MagicMock, patch
 
-import docker
 from PIL import Image
 
+from smolagents.monitoring import AgentLogger, LogLevel
 from smolagents.remote_executors import DockerExecutor, E2BExecutor
 
 from .utils.markers import require_run_all
@@ -24,12 +23,28 @@ class TestE2BExecutor:
 
 
 class TestDockerExecutor(TestCase):
-    def setUp(self):
-        self.logger = logging.getLogger("DockerExecutorTest")
-        self.executor = DockerExecutor(
-            additional_imports=["pillow", "numpy"], tools=[], logger=self.logger, initial_state={}
+    @classmethod
+    def setUpClass(cls):
+        import docker
+
+        # Skip right away, rather than failing on every test, where no Docker daemon can be reached
+        try:
+            docker.from_env().ping()
+        except docker.errors.DockerException:
+            raise SkipTest("Docker daemon is not available")
+        # Starting a container takes seconds: all tests share one, except the cleanup test which deletes its own
+        cls.logger = AgentLogger(level=LogLevel.INFO)
+        # The kernel needs the network to install packages, but not the default seccomp filtering
+        cls.executor = DockerExecutor(
+            additional_imports=["pillow", "numpy"],
+            logger=cls.logger,
+            container_run_kwargs={"security_opt": ["seccomp=unconfined"]},
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.delete()
+
     @require_run_all
     def test_initialization(self):
         """Check if DockerExecutor initializes without errors"""
@@ -59,6 +74,21 @@ final_answer(image)
         result, logs, final_answer = self.executor(code_action)
 
         self.assertIsInstance(result, Image.Image, "Result should be a PIL Image")
+        # Compare the whole pixel buffers at once rather than pixel by pixel
+        expected_image = Image.new("RGB", (10, 10), (255, 0, 0))
+        self.assertEqual(result.size, expected_image.size)
+        self.assertEqual(
+            result.convert("RGB").tobytes(), expected_image.tobytes(), "Image content should be preserved"
+        )
+
+    @require_run_all
+    def test_execute_plain_final_answer(self):
+        """Test that plain final answers come back with their type"""
+        result, logs, final_answer = self.executor("final_answer(42)")
+        self.assertTrue(final_answer)
+        self.assertEqual(result, 42)
+        result, logs, final_answer = self.executor('final_answer("The answer")')
+        self.assertEqual(result, "The answer")
 
     @require_run_all
     def test_syntax_error_handling(self):
@@ -72,9 +102,13 @@ final_answer(image)
     @require_run_all
     def test_cleanup_on_deletion(self):
         """Test if Docker container stops and removes on deletion"""
-        container_id = self.executor.container.id
-        self.executor.delete()  # Trigger cleanup
+        import docker
+
+        # The shared executor already uses the default port
+        executor = DockerExecutor(additional_imports=[], logger=self.logger, port=8889)
+        container_id = executor.container.id
+        executor.delete()  # Trigger cleanup
 
-        client = docker.from_env()
-        containers = [c.id for c in client.containers.list(all=True)]
-        self.assertNotIn(container_id, containers, "Container should be removed")
+        # Reuse the executor's Docker client and look the container up directly rather than listing all containers
+        with self.assertRaises(docker.errors.NotFound, msg="Container should be removed"):
+            executor.client.containers.get(container_id)
@@ -24,7 +24,7 @@ from IPython.core.interactiveshell import InteractiveShell
 
 from smolagents import Tool
 from smolagents.tools import tool
-from smolagents.utils import get_source, parse_code_blobs
+from smolagents.utils import encode_image_base64, get_source, make_image_url, parse_code_blobs
 
 
 class AgentTextTests(unittest.TestCase):
@@ -348,3 +348,17 @@ tool = SimpleTool()
 launch_gradio_demo(tool)
 """
         )
+
+
+@pytest.mark.parametrize("image_format, mime_type", [("JPEG", "image/jpeg"), ("PNG", "image/png")])
+def test_encode_image_base64_keeps_jpeg_images_as_jpeg(image_format, mime_type):
+    from io import BytesIO
+
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, format=image_format)
+    image = Image.open(BytesIO(buffer.getvalue()))
+    assert make_image_url(encode_image_base64(image)).startswith(f"data:{mime_type};base64,")
+    # Images that were not decoded from a file have no format, and are encoded as PNG
+    assert make_image_url(encode_image_base64(image.copy())).startswith("data:image/png;base64,")